@@ -1,105 +1,206 @@
-from collections import defaultdict
-from typing import Callable
+from typing import Callable, Optional
+
+import numpy as np
 
 
 class Rule:
     """Класс для определения и применения правил в игре '5 букв'."""
 
     TOTAL_SYMBOLS = 5
+    ALPHABET = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+    # Слово упаковывается в uint64: буква i занимает биты LETTER_BITS*i .. LETTER_BITS*(i+1)-1
+    LETTER_BITS = 6  # Бит на код буквы в упакованном слове
+    LETTER_MASK = np.uint64((1 << LETTER_BITS) - 1)
+    LETTER_SHIFTS = np.arange(TOTAL_SYMBOLS, dtype=np.uint64) * np.uint64(LETTER_BITS)
+    SELECTIVITY_SAMPLE = 1024  # Размер выборки для оценки строгости проверок
 
     def __init__(self):
-        self._exists: dict[str, set[int]] = defaultdict(set)
-        self._match: dict[str, set[int]] = defaultdict(set)
-        self._not_exists: set[str] = set()
+        self._match = np.full(self.TOTAL_SYMBOLS, -1, dtype=np.int8)  # Код буквы на позиции, -1 если неизвестна
+        self._exists = np.zeros((len(self.ALPHABET), self.TOTAL_SYMBOLS), dtype=bool)  # Буква есть, но не на позиции
+        self._not_exists = np.zeros(len(self.ALPHABET), dtype=bool)
 
     def add_exists_rule(self, symbol: str, not_matched_position: int) -> None:
         """Добавить правило, где символ существует, но не на указанной позиции."""
-        self._exists[symbol].add(not_matched_position)
+        self._exists[self.ALPHABET.index(symbol), not_matched_position] = True
 
     def add_match_rule(self, symbol: str, matched_position: int) -> None:
         """Добавить правило, где символ совпадает на указанной позиции."""
-        self._match[symbol].add(matched_position)
+        self._match[matched_position] = self.ALPHABET.index(symbol)
 
     def add_not_exists_rule(self, symbol: str) -> None:
         """Добавить правило, где символ не существует в слове."""
-        self._not_exists.add(symbol)
-
-    def matches(self, word: str) -> bool:
-        """Проверить, соответствует ли слово всем установленным правилам."""
-        for symbol, positions in self._match.items():
-            if any(word[position] != symbol for position in positions):
-                return False
-
-        for symbol, positions in self._exists.items():
-            if symbol not in word:
-                return False
-            if any(word[position] == symbol for position in positions):
-                return False
-
-        for position, symbol in enumerate(word):
-            if symbol in self._not_exists:
-                return False
+        self._not_exists[self.ALPHABET.index(symbol)] = True
+
+    @staticmethod
+    def _fields(words: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Извлечь из упакованных слов буквы на указанных позициях (матрица N×K)."""
+        return (words[:, None] >> Rule.LETTER_SHIFTS[positions]) & Rule.LETTER_MASK
+
+    def _predicates(self, words: np.ndarray, contains: np.ndarray) -> list[Callable[[np.ndarray], np.ndarray]]:
+        """Собрать проверки строк словаря для непустых видов правил; каждая проверяет все правила своего вида за один проход."""
+        predicates = []
+        match_positions = np.flatnonzero(self._match >= 0)
+        if len(match_positions):
+            match_codes = self._match[match_positions].astype(np.uint64)
+            predicates.append(lambda rows: np.all(self._fields(words[rows], match_positions) == match_codes, axis=1))
+        exists_codes, exists_positions = np.nonzero(self._exists)
+        if len(exists_codes):
+            exists_codes = exists_codes.astype(np.uint64)
+            predicates.append(lambda rows: ~np.any(self._fields(words[rows], exists_positions) == exists_codes, axis=1))
+        # Наличие буквы, уже совпавшей на известной позиции, гарантирует проверка совпадений
+        required_mask = np.any(self._exists, axis=1)
+        required_mask[self._match[match_positions]] = False
+        required = np.flatnonzero(required_mask)
+        if len(required):
+            predicates.append(lambda rows: np.all(contains[required[:, None], rows], axis=0))
+        banned = np.flatnonzero(self._not_exists)
+        if len(banned):
+            predicates.append(lambda rows: ~np.any(contains[banned[:, None], rows], axis=0))
+        return predicates
+
+    def matches(self, words: np.ndarray, contains: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Вернуть булеву маску строк rows словаря (упакованные слова и индекс наличия букв), соответствующих всем правилам."""
+        predicates = self._predicates(words, contains)
+        # Самые строгие проверки идут первыми: следующие проверяют только уцелевшие слова
+        sample = rows[::max(1, len(rows) // self.SELECTIVITY_SAMPLE)]
+        predicates.sort(key=lambda predicate: np.count_nonzero(predicate(sample)))
+
+        candidates = np.arange(len(rows))
+        for predicate in predicates:
+            candidates = candidates[predicate(rows[candidates])]
+
+        mask = np.zeros(len(rows), dtype=bool)
+        mask[candidates] = True
+        return mask
+
+
+# Смещения кодов букв по позициям для подсчёта частот в общей таблице 5×длина алфавита
+POSITION_OFFSETS = np.arange(Rule.TOTAL_SYMBOLS, dtype=np.intp) * len(Rule.ALPHABET)
+
+# Коды всех пробельных символов Юникода (самый старший — U+3000)
+WHITESPACE_CODES = np.array([code for code in range(0x3001) if chr(code).isspace()], dtype=np.uint32)
 
-        return True
+# Глобальные переменные для состояния игры
+word_arr: np.ndarray = np.empty((0, Rule.TOTAL_SYMBOLS), dtype=np.uint8)
+packed_words: np.ndarray = np.empty(0, dtype=np.uint64)
+letter_index: np.ndarray = np.zeros((len(Rule.ALPHABET), 0), dtype=bool)
+alive_indices: np.ndarray = np.empty(0, dtype=np.intp)  # Номера оставшихся возможных слов
+repeated_letters: np.ndarray = np.zeros((0, Rule.TOTAL_SYMBOLS), dtype=bool)
+position_frequencies: np.ndarray = np.zeros((Rule.TOTAL_SYMBOLS, len(Rule.ALPHABET)), dtype=np.intp)
 
 
-# Глобальные переменные для состояния игры
-all_words: list[str] = []
-matched_words: set[str] = set()
+def decode_word(codes: np.ndarray) -> str:
+    """Преобразовать строку матрицы кодов обратно в слово."""
+    return ''.join(Rule.ALPHABET[code] for code in codes)
 
 
 def read_file(filename: str = 'russian_nouns.txt') -> None:
     """Прочитать слова из файла и инициализировать списки слов."""
+    global word_arr, packed_words, letter_index, alive_indices, repeated_letters, position_frequencies
+    text = ''
     try:
         with open(filename, 'r', encoding='utf-8') as file:
-            words = [line.strip() for line in file if len(line.strip()) == Rule.TOTAL_SYMBOLS]
-            all_words.extend(words)
-            matched_words.update(words)
+            text = file.read()
     except FileNotFoundError:
         print(f"Ошибка: Файл '{filename}' не найден.")
 
+    # Весь текст переводится в коды символов одним вызовом, строки нарезаются по индексам переводов строк
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    line_ends = np.flatnonzero(codes == ord('\n'))
+    line_starts = np.concatenate(([0], line_ends + 1))
+    line_stops = np.append(line_ends, len(codes))
+
+    # Аналог line.strip(): границы строки сдвигаются к первому и последнему непробельному символу
+    content = np.flatnonzero(~np.isin(codes, WHITESPACE_CODES))
+    first = np.searchsorted(content, line_starts)
+    last = np.searchsorted(content, line_stops) - 1
+    has_content = first <= last
+    content_starts = content[first[has_content]]
+    content_lengths = content[last[has_content]] - content_starts + 1
+    word_starts = content_starts[content_lengths == Rule.TOTAL_SYMBOLS]
+    word_codes = codes[word_starts[:, None] + np.arange(Rule.TOTAL_SYMBOLS)]
+
+    # Символы переводятся в коды букв алфавита; слова с посторонними символами отбрасываются
+    unique_codes, inverse = np.unique(word_codes, return_inverse=True)
+    alphabet_indices = np.array([Rule.ALPHABET.find(chr(code)) for code in unique_codes], dtype=np.int8)
+    letters = alphabet_indices[inverse].reshape(word_codes.shape)
+    letters = letters[np.all(letters >= 0, axis=1)].astype(np.uint8)
+
+    # Слова упаковываются один раз; дубликаты отсеиваются по упакованному значению с сохранением порядка файла
+    packed = np.bitwise_or.reduce(letters.astype(np.uint64) << Rule.LETTER_SHIFTS, axis=1)
+    _, first_indices = np.unique(packed, return_index=True)
+    first_indices.sort()
+    word_arr = letters[first_indices]
+    packed_words = packed[first_indices]
+    alive_indices = np.arange(len(word_arr))
+    position_frequencies = count_letter_positions(word_arr)
+
+    # Накопленная битовая маска букв слова даёт сразу и повторные буквы, и инвертированный индекс
+    letter_bits = np.left_shift(np.uint64(1), word_arr.astype(np.uint64))
+    seen = np.bitwise_or.accumulate(letter_bits, axis=1)
+    repeated_letters = np.zeros(word_arr.shape, dtype=bool)
+    repeated_letters[:, 1:] = (seen[:, :-1] & letter_bits[:, 1:]) != 0  # Бит буквы уже был выставлен левее
+    alphabet_bits = np.uint64(1) << np.arange(len(Rule.ALPHABET), dtype=np.uint64)
+    letter_index = (seen[:, -1] & alphabet_bits[:, None]) != 0  # letter_index[буква, слово] — есть ли буква в слове
+
 
 def apply_rule(rule: Rule) -> None:
-    """Отфильтровать возможные слова на основе заданного правила."""
-    global matched_words
-    matched_words = {word for word in matched_words if rule.matches(word)}
+    """Отфильтровать возможные слова на основе заданного правила и пересчитать частоты букв по оставшимся."""
+    global alive_indices, position_frequencies
+    # Уже отсеянные слова не проверяются повторно
+    matched = rule.matches(packed_words, letter_index, alive_indices)
+    alive_indices = alive_indices[matched]  # Новый массив номеров, не длиннее прежнего
+    position_frequencies = count_letter_positions(word_arr[alive_indices])
 
 
-def update_letter_position_frequencies() -> list[dict[str, int]]:
-    """Вычислить частоту каждой буквы на каждой позиции среди оставшихся слов."""
-    position_frequencies = [defaultdict(int) for _ in range(Rule.TOTAL_SYMBOLS)]
-    for word in matched_words:
-        for i, letter in enumerate(word):
-            position_frequencies[i][letter] += 1
-    return position_frequencies
+def count_matched_words() -> int:
+    """Получить количество оставшихся возможных слов."""
+    return len(alive_indices)
 
 
-def rank_word(word: str, position_frequencies: list[dict[str, int]]) -> float:
-    """Ранжировать слово на основе частот букв на позициях."""
-    score = 0
-    used_letters = set()
-    for i, letter in enumerate(word):
-        if letter not in used_letters:
-            used_letters.add(letter)
-            score += position_frequencies[i].get(letter, 0)
-    return -score  # Отрицательное значение для сортировки по убыванию
+def get_matched_words(limit: Optional[int] = None) -> list[str]:
+    """Получить первые limit (по умолчанию все) оставшихся возможных слов в виде строк (для вывода пользователю)."""
+    return [decode_word(word_arr[index]) for index in alive_indices[:limit]]
+
+
+def count_letter_positions(words: np.ndarray) -> np.ndarray:
+    """Вычислить частоту каждой буквы на каждой позиции среди переданных слов (таблица 5×длина алфавита)."""
+    # Один проход по всем позициям сразу: у каждой позиции свой диапазон ячеек счётчика
+    counts = np.bincount((words + POSITION_OFFSETS).ravel(), minlength=Rule.TOTAL_SYMBOLS * len(Rule.ALPHABET))
+    return counts.reshape(Rule.TOTAL_SYMBOLS, len(Rule.ALPHABET))
+
+
+def rank_words(position_frequencies: np.ndarray) -> np.ndarray:
+    """Ранжировать все слова словаря на основе частот букв на позициях."""
+    positions = np.arange(Rule.TOTAL_SYMBOLS)
+    letter_scores = position_frequencies[positions, word_arr]
+    letter_scores[repeated_letters] = 0  # Повторная буква не добавляет очков
+    return -letter_scores.sum(axis=1)  # Отрицательное значение для сортировки по убыванию
 
 
 def get_top_words(n: int) -> list[str]:
     """Получить топ-N слов на основе ранжирования."""
-    position_frequencies = update_letter_position_frequencies()
-    ranked_words = sorted(
-        all_words,
-        key=lambda word: rank_word(word, position_frequencies)
-    )
-    return ranked_words[:n]
+    ranks = rank_words(position_frequencies)
+    n = min(n, len(ranks))
+    if n == 0:
+        return []
+
+    # Отбор за O(N) вместо полной сортировки: кандидаты не хуже N-го ранга, при равенстве — в порядке словаря
+    threshold = np.partition(ranks, n - 1)[n - 1]
+    candidates = np.flatnonzero(ranks <= threshold)
+    top_indices = candidates[np.argsort(ranks[candidates], kind='stable')[:n]]
+    return [decode_word(word_arr[index]) for index in top_indices]
 
 
 def update_rule(rule: Rule, word: str, result: str) -> None:
     """Обновить правила на основе результата для каждого символа в слове."""
+    # Буква, найденная в другой позиции этого же слова, при '-' лишь отсутствует на данной позиции
+    found_symbols = {symbol for symbol, symbol_result in zip(word, result) if symbol_result in '=+'}
     for position, symbol_result in enumerate(result):
         symbol = word[position]
-        if symbol_result == '-':
+        if symbol_result == '-' and symbol in found_symbols:
+            rule.add_exists_rule(symbol, position)
+        elif symbol_result == '-':
             rule.add_not_exists_rule(symbol)
         elif symbol_result == '+':
             rule.add_exists_rule(symbol, position)
@@ -120,10 +221,11 @@ def input_with_validation(prompt: str, validation: Callable[[str], bool]) -> str
 
 def choose_next_word() -> str:
     """Выбрать следующее слово на основе оставшихся возможных слов или топа ранжированных слов."""
-    if len(matched_words) <= 5:
+    if count_matched_words() <= 5:
+        matched_words = get_matched_words(5)
         print("Оставшиеся слова:", ', '.join(matched_words))
         if input_with_validation("Попробовать угадать слово (использовать первое)? (y/n): ", lambda x: x in ('y', 'n')) == 'y':
-            return list(matched_words)[0]
+            return matched_words[0]
 
     top_words = get_top_words(10)
     print("Топ слов:", ', '.join(top_words))
@@ -136,8 +238,8 @@ def choose_next_word() -> str:
 
 def game_step(rule: Rule) -> bool:
     """Выполнить шаг игры: выбрать слово и обновить правила на основе обратной связи."""
-    if len(matched_words) < 2:
-        print("Игра окончена. Оставшиеся слова:", ', '.join(matched_words))
+    if count_matched_words() < 2:
+        print("Игра окончена. Оставшиеся слова:", ', '.join(get_matched_words()))
         return False
 
     word = choose_next_word()
@@ -154,7 +256,7 @@ def main() -> None:
         while game_step(rule):
             pass
     except KeyboardInterrupt:
-        print("\nИгра прервана. Оставшиеся слова:", ', '.join(matched_words))
+        print("\nИгра прервана. Оставшиеся слова:", ', '.join(get_matched_words()))
 
 
 if __name__ == '__main__':